@@ -10,7 +10,7 @@ import time
 from pathlib import Path 
 import google.api_core.exceptions
 from browser_bridge import browser_bridge
-from utils import extract_text, delete_collection, split_chunks, convert_pptx_to_pdf_windows
+from utils import extract_text, delete_document, split_chunks, convert_pptx_to_pdf_windows
 import redis
 from google.genai import types 
 import os
@@ -223,9 +223,7 @@ def delete_project(project_id):
     print(f"\n🗑️  DELETE REQUEST for project: {project_id}")
     try:
         project_ref = db.collection(STUDY_PROJECTS_COLLECTION).document(project_id)
-        for collection_ref in project_ref.collections():
-            delete_collection(collection_ref, batch_size=50)
-        project_ref.delete()
+        delete_document(db, project_ref)
         print(f"✅ Successfully deleted project: {project_id}")
         return jsonify({"success": True}), 200
     except Exception as e:
@@ -372,9 +370,7 @@ def delete_source(project_id, source_id):
     print(f"\n🗑️  DELETE REQUEST for source: {source_id}")
     try:
         source_ref = db.collection(STUDY_PROJECTS_COLLECTION).document(project_id).collection('sources').document(source_id)
-        for collection_ref in source_ref.collections():
-            delete_collection(collection_ref, batch_size=50)
-        source_ref.delete()
+        delete_document(db, source_ref)
 
         # Invalidate Cache using unified CacheManager
         if cache_manager:
@@ -1,11 +1,14 @@
 # backend/sync_logic.py
 import shutil
+from contextlib import closing
 import hashlib
 from pathlib import Path
 from firebase_admin import firestore
 from utils import (
-    get_file_hash, 
     convert_and_upload_to_firestore, 
+    prepare_file_upload,
+    open_hash_db,
+    bulk_save,
     delete_collection, 
     generate_tree_text_from_paths
 )
@@ -141,25 +144,42 @@ def perform_sync(db, project_id: str, config_data: dict):
 
     # 🚀 PHASE 3: ATOMIC RECONCILIATION (Compare & Upload)
     processed_paths = set()
-    for file_path in files_to_process:
-        # Force forward slashes for cross-platform DB consistency
-        rel_path_str = file_path.relative_to(source_dir).as_posix()
-        processed_paths.add(rel_path_str)
-        
-        local_hash = get_file_hash(file_path)
-        db_file_meta = files_in_db.get(rel_path_str, {})
-        
-        if local_hash != db_file_meta.get('hash'):
-            logs.append(f"UPDATE: {rel_path_str}")
-            # Use original convert_and_upload util
-            result = convert_and_upload_to_firestore(
+    known_hashes = {path: meta.get('hash') for path, meta in files_in_db.items()}
+
+    # Manifest entries are only recorded once their write has succeeded, so a
+    # failed upload is retried on the next sync instead of looking unchanged
+    pending_entries = {}
+
+    def pending_uploads():
+        for file_path in files_to_process:
+            # Force forward slashes for cross-platform DB consistency
+            rel_path_str = file_path.relative_to(source_dir).as_posix()
+            processed_paths.add(rel_path_str)
+            
+            # doc_ref is None when the hash matches the manifest
+            prepared = prepare_file_upload(
                 db, project_id, file_path, source_dir, 
-                CODE_FILES_SUBCOLLECTION, CODE_PROJECTS_COLLECTION
+                CODE_FILES_SUBCOLLECTION, CODE_PROJECTS_COLLECTION,
+                known_hashes=known_hashes, hash_db=hash_db
             )
-            if result:
-                uploaded_hash, doc_id = result
-                files_in_db[rel_path_str] = {'hash': uploaded_hash, 'doc_id': doc_id}
-                updated_count += 1
+            if not prepared or prepared[1] is None:
+                continue
+            uploaded_hash, doc_ref, data = prepared
+            pending_entries[doc_ref.path] = (rel_path_str, {'hash': uploaded_hash, 'doc_id': doc_ref.id})
+            yield doc_ref, data
+
+    # Uploads are written in the background while later files are still being read.
+    # The size/mtime hash cache lives with the project's sync state and is committed once.
+    with closing(open_hash_db(storage_dir)) as hash_db, hash_db:
+        failed_paths = bulk_save(db, pending_uploads())
+
+    for doc_path, (rel_path_str, entry) in pending_entries.items():
+        if doc_path in failed_paths:
+            logs.append(f"FAILED: {rel_path_str}")
+            continue
+        logs.append(f"UPDATE: {rel_path_str}")
+        files_in_db[rel_path_str] = entry
+        updated_count += 1
 
     # 🚀 PHASE 4: PRUNING (Handle Deletions)
     # Only delete items that are in the DB but were NOT found in the local scan
@@ -249,7 +269,7 @@ def store_chunked_context(db, project_ref, full_context, total_chars):
     # Delete existing full_context document and its chunks
     full_context_ref = project_ref.collection(CODE_FILES_SUBCOLLECTION).document('project_full_context_txt')
     chunks_subcollection = full_context_ref.collection('chunks')
-    delete_collection(chunks_subcollection, batch_size=50)
+    delete_collection(db, chunks_subcollection)
     
     chunks = []
     current_pos = 0
@@ -379,7 +399,7 @@ def force_reindex_project(db, project_id):
     
     # Clean up old graph collection
     graph_coll_ref = project_ref.collection(CODE_GRAPH_COLLECTION)
-    delete_collection(graph_coll_ref, batch_size=50)
+    delete_collection(db, graph_coll_ref)
     
     print(f"  ✅ Re-indexing complete. {len(all_project_nodes)} nodes indexed.")
     return {"success": True, "node_count": len(all_project_nodes)}
\ No newline at end of file
@@ -110,11 +110,11 @@ def delete_sync_project(project_id):
         # 1. Delete Subcollections (Firestore requires manual deletion)
         print(f"🗑️ Deleting files subcollection for {project_id}...")
         files_coll = project_ref.collection(CODE_FILES_SUBCOLLECTION)
-        delete_collection(files_coll, batch_size=50)
+        delete_collection(db, files_coll)
 
         print(f"🗑️ Deleting graph nodes subcollection for {project_id}...")
         graph_coll = project_ref.collection(CODE_GRAPH_COLLECTION)
-        delete_collection(graph_coll, batch_size=50)
+        delete_collection(db, graph_coll)
 
         # 2. Delete the Project Document
         project_ref.delete()
@@ -236,7 +236,7 @@ def force_reindex_project(project_id):
     
     # G. Save Light Metadata to Firestore (Optional, for debugging)
     graph_coll_ref = project_ref.collection(CODE_GRAPH_COLLECTION)
-    delete_collection(graph_coll_ref, batch_size=50)
+    delete_collection(db, graph_coll_ref)
     
     print(f"  ✅ Re-indexing Complete. {len(all_project_nodes)} nodes indexed.")
     return {"success": True, "node_count": len(all_project_nodes)}
@@ -76,7 +76,7 @@ def run_gen_test(project_id, api_url):
     results = []
     
     for i, q in enumerate(TEST_QUESTIONS):
-        start_ts = time.time()
+        start_ts = time.perf_counter()
         error_msg = ""
         answer = ""
         status = "FAIL"
@@ -87,7 +87,7 @@ def run_gen_test(project_id, api_url):
                 "prompt": q,
                 "use_hyde": False 
             })
-            duration = time.time() - start_ts
+            duration = time.perf_counter() - start_ts
             
             if res.status_code == 200:
                 data = res.json()
@@ -100,7 +100,7 @@ def run_gen_test(project_id, api_url):
                 error_msg = f"HTTP {res.status_code}"
 
         except Exception as e:
-            duration = time.time() - start_ts
+            duration = time.perf_counter() - start_ts
             error_msg = str(e)
 
         # Analysis Logic
@@ -1,21 +1,38 @@
+import os
+# Pin protobuf's native upb runtime before any generated module loads;
+# the pure-Python fallback decodes every streamed frame far slower
+os.environ.setdefault("PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION", "upb")
 import grpc
 import agent_pb2
 import agent_pb2_grpc
 import time
 import json
 import statistics
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from termcolor import colored
-import os
+import sys
 from pathlib import Path
 
 # 🛰️ DYNAMIC TARGETING
 # Point this to your actual Extension Testing Folder
 WORKSPACE_TARGET = "D:/Projects/SA_ETF" 
 
+CHANNEL_POOL_SIZE = 4
+# Built once through termcolor (so NO_COLOR etc. still apply) instead of per streamed frame
+PHASE_FMT = colored("{}", 'magenta')
+
 class SynapseTester:
-    def __init__(self, target="127.0.0.1:50051"):
-        self.channel = grpc.insecure_channel(target)
-        self.stub = agent_pb2_grpc.AgentServiceStub(self.channel)
+    def __init__(self, target="127.0.0.1:50051", pool_size=CHANNEL_POOL_SIZE):
+        # A local subchannel pool gives every channel its own HTTP/2 connection
+        # instead of all of them sharing the global one
+        options = [('grpc.use_local_subchannel_pool', 1)]
+        self.channels = [grpc.insecure_channel(target, options=options) for _ in range(pool_size)]
+        self.stubs = [agent_pb2_grpc.AgentServiceStub(c) for c in self.channels]
+        self._next_stub = itertools.cycle(self.stubs)
+        self._mission_ids = itertools.count()
+        self._lock = threading.Lock()
         self.latencies = []
 
     def run_mission(self, name, prompt):
@@ -23,35 +40,47 @@ class SynapseTester:
         query = agent_pb2.UserQuery(
             project_id=WORKSPACE_TARGET, 
             prompt=prompt,
-            session_id=f"etf_test_{int(time.time())}"
+            # Missions run concurrently, so each needs its own session
+            session_id=f"etf_test_{int(time.time())}_{next(self._mission_ids)}"
         )
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         success = False
         tool_calls = 0
+        # Telemetry is written in one go per mission: one syscall instead of one
+        # per frame, and concurrent missions don't interleave line by line
+        buf = [f"🛰️ Telemetry for [{colored(name, 'cyan')}]\n"]
 
         try:
-            responses = self.stub.ExecuteTask(query, timeout=120)
+            responses = next(self._next_stub).ExecuteTask(query, timeout=120)
+            append = buf.append
             for res in responses:
+                # Each field access goes through the protobuf accessor, so read them once
+                phase, payload = res.phase, res.payload
                 # 🚀 SpaceX Telemetry: Show the payload
-                print(f"   📡 {colored(res.phase.upper(), 'magenta')}: {res.payload[:100]}")
+                append(f"   📡 {PHASE_FMT.format(phase.upper())}: {payload[:100]}\n")
                 
-                if "TOOL_EXEC" in res.phase:
+                if "TOOL_EXEC" in phase:
                     tool_calls += 1
-                if res.phase == "FINAL" and "timed out" not in res.payload.lower():
+                if phase == "FINAL" and "timed out" not in payload.lower():
                     success = True
             
             if not success:
-                print(f"   ⚠️ {colored('WARNING:', 'yellow')} Stream closed without 'final' phase.")
+                buf.append(f"   ⚠️ {colored('WARNING:', 'yellow')} Stream closed without 'final' phase.\n")
             
-            duration = time.time() - start_time
-            self.latencies.append(duration)
+            duration = time.perf_counter() - start_time
+            with self._lock:
+                self.latencies.append(duration)
             return {"status": "PASS" if success else "FAIL", "time": duration, "tools": tool_calls}
 
         except Exception as e:
-            print(f"   💥 {colored('CRITICAL FAILURE:', 'red')} {e}")
+            buf.append(f"   💥 {colored('CRITICAL FAILURE:', 'red')} {e}\n")
             return {"status": "CRASH", "time": 0, "tools": tool_calls}
 
+        finally:
+            sys.stdout.write("".join(buf))
+            sys.stdout.flush()
+
 # --- TEST SCENARIOS ---
 tester = SynapseTester()
 missions = [
@@ -60,7 +89,9 @@ missions = [
     ("Hybrid Logic Check", "Find the current version of 'httplib' on GitHub and check if it matches our local version.")
 ]
 
-results = [tester.run_mission(m[0], m[1]) for m in missions]
+# Missions are independent, so run them side by side across the channel pool
+with ThreadPoolExecutor(max_workers=len(missions)) as executor:
+    results = list(executor.map(lambda m: tester.run_mission(*m), missions))
 
 # Final Telemetry Report
 avg_lat = statistics.mean(tester.latencies)
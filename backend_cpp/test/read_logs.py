@@ -1,8 +1,20 @@
 import json
-import glob
 import os
+import mmap
 import sys  
 
+# orjson parses number-heavy logs (embedding vectors) several times faster
+try:
+    from orjson import loads as json_loads
+    # orjson also accepts a memoryview, so big logs can be parsed straight from a memory map
+    LOADS_BUFFERS = True
+except ImportError:
+    json_loads = json.loads
+    LOADS_BUFFERS = False
+
+# Logs at least this large are memory-mapped instead of read into a bytes copy
+MMAP_MIN_SIZE = 1024 * 1024
+
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
 
@@ -16,19 +28,24 @@ def print_latest_log():
         print("   Make sure you have run the server and generated a request.")
         return
 
-    # Find all json files
-    files = glob.glob(os.path.join(LOG_DIR, "*.json"))
+    # Find all json files; scandir stats each entry once instead of glob + getctime
+    with os.scandir(LOG_DIR) as it:
+        files = [e for e in it if e.name.endswith(".json") and e.is_file()]
     if not files:
         print(f"No log files found in {LOG_DIR}.")
         return
 
     # Get the most recent file
-    latest_file = max(files, key=os.path.getctime)
+    latest_file = max(files, key=lambda e: e.stat().st_ctime).path
     
     print(f"Reading: {latest_file}\n")
     
-    with open(latest_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    with open(latest_file, 'rb') as f:
+        if LOADS_BUFFERS and os.fstat(f.fileno()).st_size >= MMAP_MIN_SIZE:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                data = json_loads(view)
+        else:
+            data = json_loads(f.read())
         
         print("="*60)
         print(f"PROJECT: {data.get('project_id')}")
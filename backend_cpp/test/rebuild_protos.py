@@ -1,6 +1,6 @@
 import os
-import subprocess
 import sys
+from importlib import resources
 from pathlib import Path
 
 def rebuild():
@@ -34,22 +34,33 @@ def rebuild():
     # -I defines the "Import root". Protoc is picky about paths being inside the -I root.
     proto_dir = target_proto.parent
     
-    cmd = [
-        sys.executable, "-m", "grpc_tools.protoc",
+    try:
+        from grpc_tools import protoc
+    except ImportError:
+        print("❌ CRITICAL: grpc_tools not found. Run: pip install grpcio-tools")
+        sys.exit(1)
+
+    # Running protoc in-process skips a second interpreter cold start.
+    # `python -m grpc_tools.protoc` adds the bundled well-known types include; mirror it here.
+    well_known_dir = resources.files("grpc_tools") / "_proto"
+    args = [
+        "grpc_tools.protoc",
         f"-I{proto_dir}",
         f"--python_out={script_dir}",
         f"--grpc_python_out={script_dir}",
+        f"-I{well_known_dir}",
         str(target_proto)
     ]
 
     # 3. Execution
     try:
-        subprocess.check_call(cmd)
+        returncode = protoc.main(args)
+        if returncode != 0:
+            print(f"💥 Protoc failed with exit code {returncode}")
+            return
         print("✅  Stubs Rebuilt Successfully in 'test' directory.")
         print("   -> agent_pb2.py")
         print("   -> agent_pb2_grpc.py")
-    except subprocess.CalledProcessError as e:
-        print(f"💥 Protoc failed with exit code {e.returncode}")
     except Exception as e:
         print(f"❌ Error: {e}")
 
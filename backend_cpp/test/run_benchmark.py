@@ -3,28 +3,50 @@ import json
 import sys
 import os
 import argparse
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from termcolor import colored
 
+# orjson parses straight from the response bytes, skipping requests' str decode
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
 DEFAULT_API_URL = "http://127.0.0.1:5002"
+GOLDEN_DATA_FILE = 'golden_data.json'
 DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../build/Release/data"))
 
+# One pooled session so repeated calls reuse keep-alive connections
+SESSION = requests.Session()
+SESSION.mount("http://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
 def find_latest_project():
     if not os.path.exists(DATA_DIR): return None
-    subdirs = [os.path.join(DATA_DIR, d) for d in os.listdir(DATA_DIR) if os.path.isdir(os.path.join(DATA_DIR, d))]
+    # One scandir pass: DirEntry caches the type, so each entry costs a single stat
+    with os.scandir(DATA_DIR) as it:
+        subdirs = [(e.stat().st_mtime, e.name) for e in it if e.is_dir()]
     if not subdirs: return None
-    return os.path.basename(max(subdirs, key=os.path.getmtime))
+    return max(subdirs)[1]
+
+@functools.lru_cache(maxsize=4)
+def _load_golden_data(path, mtime_ns):
+    # mtime_ns is only part of the cache key: editing the file invalidates the entry
+    with open(path, 'rb') as f:
+        return json_loads(f.read())
+
+def load_golden_data(path=GOLDEN_DATA_FILE):
+    path = os.path.abspath(path)
+    return _load_golden_data(path, os.stat(path).st_mtime_ns)
 
 def check_recall(candidates, expected_list):
     if not candidates: return 0.0
-    found = 0
-    # Normalize paths (lower case, forward slashes)
-    file_paths = [c['file_path'].lower().replace('\\', '/') for c in candidates]
+    # Normalize paths (lower case, forward slashes) into one newline-separated blob,
+    # so each expected name is a single substring scan instead of one per candidate
+    paths_blob = "\n".join(c['file_path'].lower().replace('\\', '/') for c in candidates)
     
-    for exp in expected_list:
-        exp_clean = exp.lower()
-        # Loose match: Is the expected filename inside the retrieved path?
-        if any(exp_clean in fp for fp in file_paths):
-            found += 1
+    # Loose match: Is the expected filename inside a retrieved path?
+    found = sum(1 for exp in expected_list if exp.lower() in paths_blob)
             
     return found / len(expected_list) if expected_list else 1.0
 
@@ -39,37 +61,42 @@ def run_benchmark(project_id, api_url):
     
     # Load Golden Data
     try:
-        with open('golden_data.json', 'r') as f:
-            BENCHMARK = json.load(f)
+        BENCHMARK = load_golden_data()
     except FileNotFoundError:
         print(colored("❌ 'golden_data.json' not found in test directory.", "red"))
         sys.exit(1)
 
+    def fetch_candidates(case):
+        res = SESSION.post(f"{api_url}/retrieve-context-candidates", json={
+            "project_id": project_id, "prompt": case['question']
+        })
+        return json_loads(res.content).get('candidates', [])
+
     total_score = 0
     
-    for case in BENCHMARK:
-        q = case['question']
-        print(f"Testing: {q[:40]}...", end="")
-        
-        try:
-            res = requests.post(f"{api_url}/retrieve-context-candidates", json={
-                "project_id": project_id, "prompt": q
-            })
-            candidates = res.json().get('candidates', [])
-            
-            recall = check_recall(candidates, case['expected_files'])
-            total_score += recall
+    # Cases are independent, so query them concurrently and report in file order
+    with ThreadPoolExecutor(max_workers=max(1, min(8, len(BENCHMARK)))) as executor:
+        futures = [executor.submit(fetch_candidates, case) for case in BENCHMARK]
+        for case, future in zip(BENCHMARK, futures):
+            q = case['question']
+            print(f"Testing: {q[:40]}...", end="")
             
-            if recall == 1.0:
-                print(colored(" PASS", "green"))
-            else:
-                print(colored(f" FAIL ({recall*100:.0f}%)", "red"))
-                print(f"   Wanted: {case['expected_files']}")
-                # Print only filenames to keep output clean
-                top_files = [os.path.basename(c['file_path']) for c in candidates[:3]]
-                print(f"   Got Top 3: {top_files}")
-        except Exception as e:
-            print(colored(f" ERROR: {e}", "red"))
+            try:
+                candidates = future.result()
+                
+                recall = check_recall(candidates, case['expected_files'])
+                total_score += recall
+                
+                if recall == 1.0:
+                    print(colored(" PASS", "green"))
+                else:
+                    print(colored(f" FAIL ({recall*100:.0f}%)", "red"))
+                    print(f"   Wanted: {case['expected_files']}")
+                    # Print only filenames to keep output clean
+                    top_files = [os.path.basename(c['file_path']) for c in candidates[:3]]
+                    print(f"   Got Top 3: {top_files}")
+            except Exception as e:
+                print(colored(f" ERROR: {e}", "red"))
 
     if not BENCHMARK:
         print("Empty benchmark file.")
@@ -9,6 +9,10 @@ TARGET_PATH = "D:/Projects/SA_ETF"
 PROJECT_ID = "flight_test_001"
 API_URL = "http://127.0.0.1:5002"
 
+# One pooled session so repeated calls reuse keep-alive connections
+SESSION = requests.Session()
+SESSION.mount("http://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
 def run_targeted_test():
     print("--- SCRIPT INITIALIZED ---")
     
@@ -23,7 +27,7 @@ def run_targeted_test():
     
     print(f"📡 Phase 1: Registering {PROJECT_ID}...")
     try:
-        res = requests.post(f"{API_URL}/sync/register/{PROJECT_ID}", json=reg_payload, timeout=5)
+        res = SESSION.post(f"{API_URL}/sync/register/{PROJECT_ID}", json=reg_payload, timeout=5)
         print(f"   Status: {res.status_code} | Data: {res.json()}")
     except Exception as e:
         print(f"❌ Abort: Could not connect to REST server at {API_URL}. Error: {e}")
@@ -31,7 +35,9 @@ def run_targeted_test():
 
     # 2. SYNC
     print(f"📡 Phase 2: Triggering Sync...")
-    requests.post(f"{API_URL}/sync/run/{PROJECT_ID}", json={"storage_path": reg_payload["storage_path"]})
+    SESSION.post(f"{API_URL}/sync/run/{PROJECT_ID}", json={"storage_path": reg_payload["storage_path"]})
+    # The C++ server exposes no sync/warmup readiness signal to poll, so this
+    # stays a fixed wait
     print("   Sync dispatched. Waiting 3s for HNSW warmup...")
     time.sleep(3)
 
@@ -43,9 +49,9 @@ def run_targeted_test():
     }
     
     try:
-        start = time.time()
-        chat_res = requests.post(f"{API_URL}/generate-code-suggestion", json=query, timeout=600)
-        print(f"✅ Received Response in {time.time()-start:.2f}s:")
+        start = time.perf_counter()
+        chat_res = SESSION.post(f"{API_URL}/generate-code-suggestion", json=query, timeout=600)
+        print(f"✅ Received Response in {time.perf_counter()-start:.2f}s:")
         print("-" * 60)
         print(chat_res.json().get("suggestion", "EMPTY RESPONSE"))
         print("-" * 60)
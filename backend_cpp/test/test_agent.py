@@ -1,3 +1,7 @@
+import os
+# Pin protobuf's native upb runtime before any generated module loads;
+# the pure-Python fallback decodes every streamed frame far slower
+os.environ.setdefault("PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION", "upb")
 import grpc
 import agent_pb2
 import agent_pb2_grpc
@@ -15,7 +19,7 @@ def run_flight_test():
     )
 
     print("🚀 PROBE: Launching Task Request...")
-    start_time = time.time()
+    start_time = time.perf_counter()
     
     try:
         # Use a timeout to prevent infinite hanging
@@ -32,7 +36,7 @@ def run_flight_test():
     except grpc.RpcError as e:
         print(f"❌ gRPC ERROR: {e.code()} - {e.details()}")
     
-    print(f"🏁 PROBE: Mission ended in {time.time() - start_time:.2f}s")
+    print(f"🏁 PROBE: Mission ended in {time.perf_counter() - start_time:.2f}s")
 
 if __name__ == '__main__':
     run_flight_test()
\ No newline at end of file
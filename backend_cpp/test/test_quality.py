@@ -3,6 +3,7 @@ import json
 import time
 import sys
 import os
+import re
 
 # --- WINDOWS CONSOLE FIX ---
 # Forces UTF-8 so emojis (✅, 🔴) don't crash the build system
@@ -17,11 +18,24 @@ except ImportError:
     # Fallback to plain text if missing
     def colored(text, color=None, attrs=None): return text
 
+# orjson is optional; it parses the large telemetry payloads several times faster
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
 # CONFIGURATION
 API_URL = "http://localhost:5002"
 TELEMETRY_URL = f"{API_URL}/api/admin/telemetry"
 GENERATE_URL = f"{API_URL}/generate-code-suggestion"
 
+# One pooled session so repeated calls reuse keep-alive connections
+SESSION = requests.Session()
+SESSION.mount("http://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# Context headers look like "# FILE: src/main.ts | ..."; one scan of the prompt finds them all
+FILE_RE = re.compile(r"^# FILE:([^|\n]*)", re.M)
+
 # !!! IMPORTANT !!! 
 # REPLACE THIS with the Project ID seen in your Dashboard Logs
 TARGET_PROJECT_ID = "REPLACE_WITH_YOUR_ACTUAL_PROJECT_ID" 
@@ -44,7 +58,7 @@ def run_tests():
     
     # Check if server is up
     try:
-        requests.get(f"{API_URL}/api/hello", timeout=1)
+        SESSION.get(f"{API_URL}/api/hello", timeout=1)
     except requests.exceptions.ConnectionError:
         print(colored("❌ CRITICAL: Server is OFFLINE. Run code_assistance_server.exe first.", "red"))
         sys.exit(1)
@@ -62,7 +76,7 @@ def run_tests():
                 "use_hyde": False
             }
             # Wait for generation (this blocks until AI is done)
-            requests.post(GENERATE_URL, json=payload)
+            SESSION.post(GENERATE_URL, json=payload)
         except Exception as e:
             print(colored(f"❌ API Failed: {e}", "red"))
             continue
@@ -70,8 +84,8 @@ def run_tests():
         # 2. Inspect Telemetry
         # The log we just generated should be at index 0 (newest)
         time.sleep(0.5) # Slight buffer for async write
-        telem_res = requests.get(TELEMETRY_URL)
-        telemetry = telem_res.json()
+        telem_res = SESSION.get(TELEMETRY_URL)
+        telemetry = json_loads(telem_res.content)
         
         if not telemetry['logs']:
             print(colored("❌ NO LOGS FOUND. Check Project ID.", "red"))
@@ -81,20 +95,16 @@ def run_tests():
         
         # 3. Validation Logic
         context = latest_log['full_prompt']
-        retrieved_files = []
-        
-        for line in context.split('\n'):
-            if line.startswith("# FILE:"):
-                parts = line.split('|')
-                path = parts[0].replace("# FILE:", "").strip()
-                retrieved_files.append(path)
+        retrieved_files = [path.strip() for path in FILE_RE.findall(context)]
                 
         found_count = 0
         missing = []
+        # Built once per test so each expected file is a single substring scan
+        retrieved_blob = "\n".join(retrieved_files)
         
         for expected in test['expected_files']:
             # Flexible matching (find "main.ts" inside "src/main.ts")
-            if any(expected in f for f in retrieved_files):
+            if expected in retrieved_blob:
                 found_count += 1
             else:
                 missing.append(expected)